@@ -14,62 +14,72 @@ Warning rules (exit code 0 with stderr):
 - Using find -name instead of ripgrep
 """
 
+import functools
 import json
 import sys
 import re
+import shlex
 
 
 # Define validation rules
 # System safety rules - these MUST be blocked
-SYSTEM_SAFETY_RULES = [
+# Each rule is (pattern, trigger literals, message). A pattern can only match a
+# command that contains at least one of its trigger literals, which lets benign
+# commands skip the regex scan entirely. Use an empty tuple if a rule has no
+# literal anchor - that disables the pre-filter.
+#
+# Commands are lowercased once before matching, so patterns and triggers MUST be
+# written in lowercase (escapes like \S and \b are fine) and are compiled without
+# re.IGNORECASE.
+_SYSTEM_SAFETY_PATTERNS = [
     # Filesystem destruction
-    (r'\brm\s+(-[rfI]*\s+)*(/|/\*|~|\$HOME|/Users|/home|/var|/etc|/usr|/bin|/opt)(\s|$)', 
+    (r'\brm\s+(-[rfi]*\s+)*(/|/\*|~|\$home|/users|/home|/var|/etc|/usr|/bin|/opt)(\s|$)', ('rm',),
      "🚫 CATASTROPHIC: This would delete critical system directories!"),
-    (r'\brm\s+(-[rfI]*\s+)*(\.|\.\.|\.\*)(\s|$)', 
+    (r'\brm\s+(-[rfi]*\s+)*(\.|\.\.|\.\*)(\s|$)', ('rm',),
      "🚫 DANGEROUS: This would delete current directory or all hidden files!"),
-    (r'\brm\s+(-[rfI]*\s+)*\*(\s|$)', 
+    (r'\brm\s+(-[rfi]*\s+)*\*(\s|$)', ('rm',),
      "🚫 DANGEROUS: This would delete all files in current directory!"),
-    (r'\bfind\s+/\s+.*-delete', 
+    (r'\bfind\s+/\s+.*-delete', ('-delete',),
      "🚫 CATASTROPHIC: Recursive deletion from root directory!"),
     
     # Disk operations
-    (r'\b(dd|mkfs|fdisk|parted|shred)\b.*(/dev/[sh]d|/dev/nvme|/dev/disk)', 
+    (r'\b(dd|mkfs|fdisk|parted|shred)\b.*(/dev/[sh]d|/dev/nvme|/dev/disk)', ('/dev/',),
      "🚫 BLOCKED: Direct disk operations can destroy all data!"),
-    (r'\b>\s*/dev/(sd|hd|nvme)', 
+    (r'\b>\s*/dev/(sd|hd|nvme)', ('/dev/',),
      "🚫 DISK CORRUPTION: Never write directly to disk devices!"),
     
     # Permission disasters
-    (r'\bchmod\s+(-R\s+)?777\b', 
+    (r'\bchmod\s+(-r\s+)?777\b', ('777',),
      "🚫 SECURITY DISASTER: Never use 777 permissions - this makes files world-writable!"),
-    (r'\bchmod\s+(-R\s+)?000\s+/(bin|usr|etc|\s|$)', 
+    (r'\bchmod\s+(-r\s+)?000\s+/(bin|usr|etc|\s|$)', ('000',),
      "🚫 SYSTEM BREAK: This would make critical system files inaccessible!"),
-    (r'\bchown\s+(-R\s+)?.*/(\s|$)', 
+    (r'\bchown\s+(-r\s+)?.*/(\s|$)', ('chown',),
      "🚫 OWNERSHIP DISASTER: Changing ownership of root directory breaks the system!"),
     
     # System corruption
-    (r':(\(\))\{:\|:&\};:', 
+    (r':(\(\))\{:\|:&\};:', (':(){',),
      "🚫 FORK BOMB: This would crash the system by creating infinite processes!"),
-    (r'\b>\s*/etc/(passwd|sudoers|shadow|group)', 
+    (r'\b>\s*/etc/(passwd|sudoers|shadow|group)', ('/etc/',),
      "🚫 SYSTEM CORRUPTION: This would corrupt critical system files!"),
     
     # Remote execution
-    (r'(curl|wget)\s+[^|]*\|\s*(sudo\s+)?(bash|sh|python|ruby|perl)', 
+    (r'(curl|wget)\s+[^|]*\|\s*(sudo\s+)?(bash|sh|python|ruby|perl)', ('curl', 'wget'),
      "🚫 SECURITY RISK: Never pipe remote content to interpreters - this allows arbitrary code execution!"),
-    (r'\bnc\s+-l.*(-e|>.*/(bash|sh))', 
+    (r'\bnc\s+-l.*(-e|>.*/(bash|sh))', ('nc',),
      "🚫 BACKDOOR: This opens a network backdoor to your system!"),
     
     # Development environment destruction
-    (r'\b(brew|apt|yum|dnf|pacman)\s+(remove|uninstall|purge)\s+(-[yf]|--yes|--force).*\*', 
+    (r'\b(brew|apt|yum|dnf|pacman)\s+(remove|uninstall|purge)\s+(-[yf]|--yes|--force).*\*', ('remove', 'uninstall', 'purge'),
      "🚫 PACKAGE DISASTER: This would remove all packages!"),
-    (r'docker\s+system\s+prune\s+-a.*--volumes', 
+    (r'docker\s+system\s+prune\s+-a.*--volumes', ('prune',),
      "🚫 DOCKER WIPE: This would delete all Docker data including volumes!"),
     
     # Search command restrictions
-    (r'\bfind\s+\S+\s+-name\b',
+    (r'\bfind\s+\S+\s+-name\b', ('-name',),
      "🚫 Use 'rg --files -g pattern' or 'rg --files | rg pattern' instead of 'find -name' for better performance"),
 
     # Heredoc syntax (incompatible with fish shell)
-    (r'(cat|tee)\s+>.*<<\s*["\']?EOF["\']?',
+    (r'(cat|tee)\s+>.*<<\s*["\']?eof["\']?', ('<<',),
      "🚫 FISH INCOMPATIBLE: Heredoc syntax (<<EOF) doesn't work in fish shell!\n"
      "Alternative 1 (printf): printf '%s\\n' 'line1' 'line2' > file\n"
      "Alternative 2 (echo -e): echo -e 'line1\\nline2' > file\n"
@@ -77,49 +87,215 @@ SYSTEM_SAFETY_RULES = [
 ]
 
 # Warning rules - provide guidance but don't block
-WARNING_RULES = [
+_WARNING_PATTERNS = [
     # Currently empty - all rules moved to blocking
 ]
 
+SYSTEM_SAFETY_MESSAGES = {f'r{i}': message for i, (_, _, message) in enumerate(_SYSTEM_SAFETY_PATTERNS)}
+
+# Literal pre-filter: None means some rule has no trigger and every command is scanned
+SYSTEM_SAFETY_TRIGGERS = (
+    tuple(sorted({t for _, triggers, _ in _SYSTEM_SAFETY_PATTERNS for t in triggers}))
+    if all(triggers for _, triggers, _ in _SYSTEM_SAFETY_PATTERNS) else None
+)
+
+# Commands that only read or print and never execute their arguments. A simple
+# command (no shell metacharacters) headed by one of these cannot trip any rule.
+# Not rg: rg --pre <cmd> runs <cmd> on every file it searches.
+INERT_COMMANDS = frozenset([
+    'cat', 'cd', 'df', 'diff', 'du', 'file', 'grep', 'head', 'less', 'ls',
+    'pwd', 'stat', 'tail', 'tree', 'wc', 'which',
+])
+SHELL_METACHARS = frozenset(';&|<>()$`\\\n\r')
+
+WARNING_RULES = [(re.compile(pattern), message) for pattern, message in _WARNING_PATTERNS]
+
+# Single- or double-quoted string, whichever opens first
+QUOTED_STRING_RE = re.compile(
+    r"'[^']*'"                # single quotes: no escapes
+    r'|"(?:[^"\\]|\\.)*"',    # double quotes: backslash escapes, as in POSIX shells
+    re.DOTALL,
+)
+
+# Characters that end a simple command when tokenizing a command line. ( ) and `
+# also open and close subshells and command substitutions.
+SHELL_SEPARATOR_CHARS = ';&|()`\n'
+# Stands in for a $(...), `...` or <(...) substitution in the command around it
+SUBSTITUTION_WORD = '$(...)'
+
+# git global options that take their value as the next argument (git -C dir commit)
+GIT_GLOBAL_VALUE_OPTIONS = frozenset([
+    '-C', '-c', '--git-dir', '--work-tree', '--namespace', '--config-env',
+])
+# git commit options that take their value as the next argument (-m "msg")
+GIT_COMMIT_VALUE_OPTIONS = frozenset([
+    '--author', '--cleanup', '--date', '--file', '--fixup', '--message',
+    '--pathspec-from-file', '--reedit-message', '--reuse-message', '--squash',
+    '--template', '--trailer',
+])
+# Short flags whose value is the rest of the cluster (-mmsg) or the next argument
+GIT_COMMIT_VALUE_FLAGS = 'CFcmt'
+# Short flags that only take an attached value (-S<keyid>, -u<mode>)
+GIT_COMMIT_ATTACHED_VALUE_FLAGS = 'Su'
+# git accepts any unambiguous prefix of a long option; shorter ones clash with --no-verbose
+NO_VERIFY_OPTION = '--no-verify'
+NO_VERIFY_MIN_PREFIX = len('--no-veri')
+
+GIT_NO_VERIFY_MESSAGE = (
+    "🚫 Git commit with --no-verify flag is not allowed.\n"
+    "This ensures all git hooks and verification steps are properly executed.\n"
+    "Please run the git commit without the --no-verify flag."
+)
+
+
+@functools.lru_cache(maxsize=1)
+def system_safety_re():
+    """Fuse all safety rules into a single alternation so a command is scanned once.
+    
+    Each rule becomes a named group (r0, r1, ...) that maps back to its message.
+    The hook runs in a fresh process per command and compiling costs a few ms,
+    so this only happens once a command gets past the pre-filters.
+    """
+    return re.compile(
+        '|'.join(f'(?P<r{i}>{pattern})' for i, (pattern, _, _) in enumerate(_SYSTEM_SAFETY_PATTERNS))
+    )
+
 
 def remove_quoted_strings(command):
     """Remove quoted strings to avoid false positives in command checking."""
-    # Remove single-quoted strings
-    cleaned = re.sub(r"'[^']*'", "", command)
-    # Remove double-quoted strings
-    cleaned = re.sub(r'"[^"]*"', "", cleaned)
-    return cleaned
+    # One left-to-right pass, so a quote character inside the other kind of
+    # quotes (e.g. "it's") doesn't open a new string. Unterminated quotes are kept.
+    return QUOTED_STRING_RE.sub("", command)
 
 
 def check_system_safety(command):
     """Check command against system safety rules."""
-    # Don't check quoted strings for safety rules
-    cleaned_cmd = remove_quoted_strings(command)
+    # Fast path: a plain read-only command needs no regex work at all
+    head = command.split(None, 1)
+    if head and head[0] in INERT_COMMANDS and SHELL_METACHARS.isdisjoint(command):
+        return False, ""
+    
+    # Don't check quoted strings for safety rules; rules are written in lowercase
+    cleaned_cmd = remove_quoted_strings(command).lower()
+    
+    # Most commands contain none of the trigger literals - skip the regex for them
+    if SYSTEM_SAFETY_TRIGGERS is not None:
+        if not any(trigger in cleaned_cmd for trigger in SYSTEM_SAFETY_TRIGGERS):
+            return False, ""
     
-    for pattern, message in SYSTEM_SAFETY_RULES:
-        if re.search(pattern, cleaned_cmd, re.IGNORECASE):
-            return True, message
+    match = system_safety_re().search(cleaned_cmd)
+    if match:
+        return True, SYSTEM_SAFETY_MESSAGES[match.lastgroup]
     
     return False, ""
 
 
+def split_simple_commands(command):
+    """Tokenize a command line like a POSIX shell and split it at ;, &&, |, etc.
+    
+    The body of a subshell or command substitution is returned as commands of its
+    own, and the command around it carries on after the closing ) or backtick.
+    Raises ValueError on unbalanced quotes, like shlex.split.
+    """
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=SHELL_SEPARATOR_CHARS)
+    lexer.whitespace_split = True
+    # Newlines separate commands, so they are punctuation rather than whitespace
+    lexer.whitespace = ' \t\r'
+    # A shell only starts a comment with # at the start of a word, while shlex would
+    # also cut issue#12 short. Keeping everything errs toward finding a flag.
+    lexer.commenters = ''
+    tokens = list(lexer)
+    
+    commands = []
+    # One [closing character, current command] pair per open subshell or substitution
+    levels = [[None, []]]
+    for i, token in enumerate(tokens):
+        if not set(token) <= set(SHELL_SEPARATOR_CHARS):
+            levels[-1][1].append(token)
+            continue
+        # The & in 2>&1, >&2 and &>file belongs to a redirection, not a separator
+        if token == '&' and ((i > 0 and tokens[i - 1].endswith(('>', '<'))) or
+                             (i + 1 < len(tokens) and tokens[i + 1].startswith('>'))):
+            levels[-1][1].append(token)
+            continue
+        
+        # shlex groups runs of punctuation, e.g. ')|' or '((', so go character by character
+        for char in token:
+            if char == '(' or (char == '`' and levels[-1][0] != '`'):
+                levels[-1][1].append(SUBSTITUTION_WORD)
+                levels.append([')' if char == '(' else '`', []])
+            elif char == levels[-1][0]:
+                commands.append(levels.pop()[1])
+            else:
+                commands.append(levels[-1][1])
+                levels[-1][1] = []
+    
+    # The outermost command, plus any substitution left unclosed
+    commands.extend(command for _, command in levels)
+    return [tokens for tokens in commands if tokens]
+
+
+def git_commit_args(tokens):
+    """Return the arguments after `commit` if the command runs git commit, else None"""
+    # Not just the first git: in `sudo -u git git commit` that's a user name
+    for i, token in enumerate(tokens):
+        if token != 'git' and not token.endswith('/git'):
+            continue
+        
+        # Skip global options (git -c key=value -C dir commit ...) to find the subcommand
+        args = iter(tokens[i + 1:])
+        for arg in args:
+            if arg in GIT_GLOBAL_VALUE_OPTIONS:
+                next(args, None)
+            elif not arg.startswith('-'):
+                if arg == 'commit':
+                    return list(args)
+                break
+    return None
+
+
+def has_no_verify_flag(args):
+    """Check git commit arguments for --no-verify or -n, skipping option values"""
+    args = iter(args)
+    for arg in args:
+        if arg == '--':
+            break
+        if arg.startswith('--'):
+            name = arg.split('=', 1)[0]
+            if len(name) >= NO_VERIFY_MIN_PREFIX and NO_VERIFY_OPTION.startswith(name):
+                return True
+            if arg in GIT_COMMIT_VALUE_OPTIONS:
+                next(args, None)
+        elif arg.startswith('-'):
+            # Short flags can be clustered (-an); a value flag ends the cluster
+            for i, flag in enumerate(arg[1:], 2):
+                if flag == 'n':
+                    return True
+                if flag in GIT_COMMIT_VALUE_FLAGS:
+                    if i == len(arg):
+                        next(args, None)
+                    break
+                if flag in GIT_COMMIT_ATTACHED_VALUE_FLAGS:
+                    break
+    return False
+
+
 def check_git_no_verify(command):
     """Check if git commit command has --no-verify or -n flag."""
-    if not re.search(r'\bgit\b', command):
+    if 'git' not in command:
         return False, ""
     
-    cleaned_cmd = remove_quoted_strings(command)
-    
-    # Only check for --no-verify on commit commands
-    if not re.search(r'\bgit\s+commit\b', cleaned_cmd):
+    try:
+        # Quoting is resolved by the tokenizer, so a quoted "-n" stays part of its argument
+        commands = split_simple_commands(command)
+    except ValueError:
+        # Unbalanced quotes - the shell would reject the command anyway
         return False, ""
     
-    # Check for --no-verify or -n flag
-    no_verify_pattern = r'(^|\s)--no-verify($|=|\s)'
-    short_n_pattern = r'(^|\s)-n($|\s)'
-    
-    if re.search(no_verify_pattern, cleaned_cmd) or re.search(short_n_pattern, cleaned_cmd):
-        return True, "🚫 Git commit with --no-verify flag is not allowed.\nThis ensures all git hooks and verification steps are properly executed.\nPlease run the git commit without the --no-verify flag."
+    for tokens in commands:
+        args = git_commit_args(tokens)
+        if args is not None and has_no_verify_flag(args):
+            return True, GIT_NO_VERIFY_MESSAGE
     
     return False, ""
 
@@ -129,7 +305,7 @@ def check_warnings(command):
     warnings = []
     
     for pattern, message in WARNING_RULES:
-        if re.search(pattern, command):
+        if pattern.search(command):
             warnings.append(message)
     
     return warnings
@@ -181,7 +357,7 @@ def main():
     except json.JSONDecodeError:
         # If JSON parsing fails, allow the command (fail open)
         sys.exit(0)
-    except Exception as e:
+    except Exception:
         # For any other errors, allow the command (fail open)
         sys.exit(0)
 
@@ -13,38 +13,47 @@ Future support: go.mod
 import json
 import sys
 import os
+import re
 
 # Add the hooks directory to Python path so we can import from dependency_checkers
 hooks_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, hooks_dir)
 
-# Import checkers from the modular structure
+# Import the checkers package; individual checkers are loaded on first use
 try:
-    from dependency_checkers import CargoChecker, NpmChecker, PipChecker
+    import dependency_checkers
 except ImportError:
     # If running from symlink, try to import using the full path
     import importlib.util
-    spec = importlib.util.spec_from_file_location("dependency_checkers", os.path.join(hooks_dir, "dependency_checkers", "__init__.py"))
+    package_dir = os.path.join(hooks_dir, "dependency_checkers")
+    spec = importlib.util.spec_from_file_location(
+        "dependency_checkers",
+        os.path.join(package_dir, "__init__.py"),
+        submodule_search_locations=[package_dir]
+    )
     dependency_checkers = importlib.util.module_from_spec(spec)
+    sys.modules["dependency_checkers"] = dependency_checkers
     spec.loader.exec_module(dependency_checkers)
-    
-    CargoChecker = dependency_checkers.CargoChecker
-    NpmChecker = dependency_checkers.NpmChecker
-    PipChecker = dependency_checkers.PipChecker
 
-# Registry of all checkers
-CHECKERS = [
-    CargoChecker(),
-    NpmChecker(),
-    PipChecker(),
-]
+# Hook output when there is nothing to report; written as-is to skip the JSON encoder
+EMPTY_RESULT = '{}\n'
+
+# Every version specifier the checkers understand contains a digit
+VERSION_TOKEN_RE = re.compile(r'\d')
+
+# Update instruction format by file suffix
+UPDATE_FORMATS = {
+    'package.json': '{name}: "{latest}"',      # npm colon format
+    'requirements.txt': '{name}=={latest}',
+    '.py': '{name}>={latest}',                 # inline script metadata
+}
+# Cargo.toml and pyproject.toml use the equals format
+DEFAULT_UPDATE_FORMAT = '{name} = "{latest}"'
 
 def get_checker(file_path):
     """Get appropriate checker for file type"""
-    for checker in CHECKERS:
-        if checker.can_handle(file_path):
-            return checker
-    return None
+    checker = dependency_checkers.checker_for(file_path)
+    return checker() if checker else None
 
 def format_outdated_report(file_path, outdated_deps):
     """Format a report of outdated dependencies"""
@@ -64,20 +73,14 @@ def format_outdated_report(file_path, outdated_deps):
     
     lines.extend(["", "To fix, update the versions:"])
     
+    # Pick the update instruction format for this file type once
+    update_template = next(
+        (fmt for suffix, fmt in UPDATE_FORMATS.items() if file_path.endswith(suffix)),
+        DEFAULT_UPDATE_FORMAT
+    )
+    
     for dep in outdated_deps:
-        # Format update instructions based on file type
-        if file_path.endswith('package.json'):
-            # For npm, use the colon format
-            update_format = f"{dep['name']}: \"{dep['latest']}\""
-        elif file_path.endswith('requirements.txt'):
-            # For requirements.txt, use == format
-            update_format = f"{dep['name']}=={dep['latest']}"
-        elif file_path.endswith('.py'):
-            # For inline scripts, show the package with version
-            update_format = f"{dep['name']}>={dep['latest']}"
-        else:
-            # For Cargo.toml and pyproject.toml, use the equals format
-            update_format = f"{dep['name']} = \"{dep['latest']}\""
+        update_format = update_template.format(name=dep['name'], latest=dep['latest'])
         
         if dep['is_major']:
             lines.append(f"- Update to {update_format} (review {dep['url']})")
@@ -86,6 +89,28 @@ def format_outdated_report(file_path, outdated_deps):
     
     return "\n".join(lines)
 
+def check_multi_edit(checker, file_path, edits):
+    """Check the dependencies changed by each edit of a MultiEdit together
+    
+    Each edit is compared with the text it replaced on its own, then all the changes
+    go through one batch of concurrent lookups. Edits that contain no version token
+    are skipped, and a dependency changed by several edits is only reported once.
+    """
+    # A dict rather than a set keeps the order of the edits
+    changed = {}
+    for edit in edits:
+        new_string = edit.get('new_string', '')
+        if not VERSION_TOKEN_RE.search(new_string):
+            continue
+        changed.update(dict.fromkeys(
+            checker.changed_dependencies(file_path, new_string, edit.get('old_string', ''))
+        ))
+    
+    outdated = {}
+    for dep in checker.find_outdated(list(changed)):
+        outdated.setdefault(dep['name'], dep)
+    return list(outdated.values())
+
 def main():
     try:
         # Read JSON input from stdin
@@ -106,32 +131,40 @@ def main():
         # Get checker for this file type
         checker = get_checker(file_path)
         if not checker:
-            print(json.dumps({}))
+            sys.stdout.write(EMPTY_RESULT)
             return
         
         # Get the new content from the tool input
         new_content = ""
+        previous_content = None
+        outdated = None
         tool_name = hook_input.get('tool_name', '')
         
         if tool_name == 'Write':
+            # This runs after the write, so there's no prior file content to diff against
             new_content = hook_input.get('tool_input', {}).get('content', '')
         elif tool_name == 'Edit':
             new_content = hook_input.get('tool_input', {}).get('new_string', '')
+            # Only check dependencies the edit added or changed
+            previous_content = hook_input.get('tool_input', {}).get('old_string', '')
+            if not VERSION_TOKEN_RE.search(new_content):
+                sys.stdout.write(EMPTY_RESULT)
+                return
         elif tool_name == 'MultiEdit':
             # For MultiEdit on package.json, same issue - skip checking
             if file_path.endswith('package.json'):
-                print(json.dumps({}))
+                sys.stdout.write(EMPTY_RESULT)
                 return
-            # For MultiEdit, concatenate all new_strings
             edits = hook_input.get('tool_input', {}).get('edits', [])
-            new_content = '\n'.join(edit.get('new_string', '') for edit in edits)
-        
-        if not new_content:
-            print(json.dumps({}))
-            return
+            outdated = check_multi_edit(checker, file_path, edits)
         
-        # Check dependencies
-        outdated = checker.check_dependencies(file_path, new_content)
+        if outdated is None:
+            if not new_content:
+                sys.stdout.write(EMPTY_RESULT)
+                return
+            
+            # Check dependencies
+            outdated = checker.check_dependencies(file_path, new_content, previous_content)
         
         # Format report
         report = format_outdated_report(file_path, outdated)
@@ -143,12 +176,12 @@ def main():
             }
             print(json.dumps(result))
         else:
-            print(json.dumps({}))
+            sys.stdout.write(EMPTY_RESULT)
             
     except Exception as e:
         # On error, allow but log to stderr
         print(f"Dependency checker error: {str(e)}", file=sys.stderr)
-        print(json.dumps({}))
+        sys.stdout.write(EMPTY_RESULT)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
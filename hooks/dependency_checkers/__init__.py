@@ -1,9 +1,34 @@
 """
 Dependency checkers for various package managers.
+
+Checkers are imported on first access, so a hook run only loads the one it needs.
 """
 
-from .cargo_checker import CargoChecker
-from .npm_checker import NpmChecker
-from .pip_checker import PipChecker
+import importlib
+
+# Registry of all checkers: the module each lives in and the file suffixes it handles.
+# Matching on suffix first means an edit to any other file imports no checker.
+_CHECKER_MODULES = {
+    'CargoChecker': ('.cargo_checker', ('Cargo.toml',)),
+    'NpmChecker': ('.npm_checker', ('package.json',)),
+    'PipChecker': ('.pip_checker', ('requirements.txt', 'pyproject.toml', '.py')),
+}
+
+__all__ = ['CargoChecker', 'NpmChecker', 'PipChecker', 'checker_for']
+
+
+def checker_for(file_path):
+    """Return the checker class that handles a file, or None"""
+    for name, (_, suffixes) in _CHECKER_MODULES.items():
+        if file_path.endswith(suffixes):
+            return __getattr__(name)
+    return None
+
 
-__all__ = ['CargoChecker', 'NpmChecker', 'PipChecker']
\ No newline at end of file
+def __getattr__(name):
+    if name not in _CHECKER_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, _ = _CHECKER_MODULES[name]
+    checker = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = checker
+    return checker
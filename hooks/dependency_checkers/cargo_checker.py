@@ -3,26 +3,46 @@ Cargo.toml dependency checker for Rust projects.
 """
 
 import re
-import subprocess
+from urllib.parse import quote
+
+from .registry import fetch_json, lookup_all
+from .toml_support import get_tomllib
+from .version_cache import cached_latest_version
+
+# Quoted version string: "1.2", "1.2.3" or "1.2.3-beta.1"
+VERSION_RE = re.compile(r'"([0-9]+\.[0-9]+(?:\.[0-9]+)?(?:-[^"]+)?)"')
+# Table format: { version = "x.y.z", ... }
+TABLE_VERSION_RE = re.compile(r'version\s*=\s*"([0-9]+\.[0-9]+(?:\.[0-9]+)?(?:-[^"]+)?)"')
+# Bare version value: 1.2, 1.2.3 or 1.2.3-beta.1
+BARE_VERSION_RE = re.compile(r'[0-9]+\.[0-9]+(?:\.[0-9]+)?(?:-[^"]+)?')
+# A whole line of the form name = "version" or name = { ... version ... }.
+# Matched with finditer over the content, so no part of it may cross a newline.
+DEPENDENCY_LINE_RE = re.compile(
+    r'^[^\S\n]*([a-zA-Z0-9_-]+)[^\S\n]*=[^\S\n]*(\{[^}\n]*version[^}\n]*\}|"[0-9]+(?:\.[0-9]+)*).*$',
+    re.MULTILINE
+)
+# Common [package] fields that look like name = "version" but aren't dependencies
+PACKAGE_FIELDS = frozenset([
+    'name', 'version', 'authors', 'edition', 'description',
+    'license', 'repository', 'homepage', 'documentation',
+    'readme', 'keywords', 'categories', 'build', 'links',
+    'exclude', 'include', 'publish', 'metadata', 'resolver',
+])
 
 
 class CargoChecker:
     """Check Rust Cargo.toml dependencies"""
     
-    @staticmethod
-    def can_handle(file_path):
-        return file_path.endswith('Cargo.toml')
-    
     @staticmethod
     def extract_version(dep_line):
         """Extract version from dependency string"""
         # Simple format: crate = "version"
-        match = re.search(r'"([0-9]+\.[0-9]+(?:\.[0-9]+)?(?:-[^"]+)?)"', dep_line)
+        match = VERSION_RE.search(dep_line)
         if match:
             return match.group(1)
         
         # Workspace format: { version = "x.y.z" }
-        match = re.search(r'version\s*=\s*"([0-9]+\.[0-9]+(?:\.[0-9]+)?(?:-[^"]+)?)"', dep_line)
+        match = TABLE_VERSION_RE.search(dep_line)
         if match:
             return match.group(1)
         
@@ -50,22 +70,46 @@ class CargoChecker:
         return False
     
     @staticmethod
+    @cached_latest_version('crates')
     def get_latest_version(dep_name):
+        """Get latest version from crates.io, falling back to cargo search"""
+        return (CargoChecker.get_registry_version(dep_name) or
+                CargoChecker.get_cargo_search_version(dep_name))
+    
+    @staticmethod
+    def get_registry_version(dep_name):
+        """Get latest version from the crates.io API"""
+        data = fetch_json(f'https://crates.io/api/v1/crates/{quote(dep_name)}')
+        if not data:
+            return None
+        
+        crate = data.get('crate', {})
+        # max_stable_version is null when a crate only has pre-releases
+        return crate.get('max_stable_version') or crate.get('max_version')
+    
+    @staticmethod
+    def get_cargo_search_version(dep_name):
         """Get latest version using cargo search"""
+        # Only needed when the registry API is unreachable
+        import subprocess
+        
         try:
+            # Keep stdout as bytes and only decode the one line we need
             result = subprocess.run(
                 ['cargo', 'search', dep_name, '--limit', '1'],
-                capture_output=True,
-                text=True,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 timeout=5
             )
             
             if result.returncode != 0:
                 return None
             
+            prefix = f"{dep_name} ".encode()
             for line in result.stdout.splitlines():
-                if line.startswith(f"{dep_name} "):
-                    match = re.search(r'"([0-9]+\.[0-9]+(?:\.[0-9]+)?(?:-[^"]+)?)"', line)
+                if line.startswith(prefix):
+                    match = VERSION_RE.search(line.decode('ascii', 'ignore'))
                     if match:
                         return match.group(1)
             
@@ -76,51 +120,109 @@ class CargoChecker:
     @staticmethod
     def extract_dependencies(content):
         """Extract dependencies from content"""
+        dependencies = CargoChecker.extract_manifest_dependencies(content)
+        if dependencies is None:
+            # Edit fragments like 'serde = "1.0"' have no dependency tables
+            dependencies = CargoChecker.extract_line_dependencies(content)
+        return dependencies
+    
+    @staticmethod
+    def extract_manifest_dependencies(content):
+        """Extract dependencies from a full Cargo.toml, or None if content isn't one"""
+        tomllib = get_tomllib()
+        if tomllib is None:
+            # No TOML support available - fall back to line parsing
+            return None
+        
+        try:
+            data = tomllib.loads(content)
+        except Exception:
+            return None
+        
+        table_names = ('dependencies', 'dev-dependencies', 'build-dependencies')
+        tables = [data.get(name) for name in table_names]
+        tables.append(data.get('workspace', {}).get('dependencies'))
+        # [target.'cfg(...)'.dependencies] and friends
+        for target in data.get('target', {}).values():
+            if isinstance(target, dict):
+                tables.extend(target.get(name) for name in table_names)
+        
+        tables = [table for table in tables if isinstance(table, dict)]
+        if not tables:
+            return None
+        
         dependencies = []
+        for table in tables:
+            for dep_name, spec in table.items():
+                if isinstance(spec, dict):
+                    # Skip workspace and path dependencies
+                    if spec.get('workspace') or 'path' in spec:
+                        continue
+                    spec = spec.get('version')
+                
+                if isinstance(spec, str) and BARE_VERSION_RE.fullmatch(spec):
+                    dependencies.append((dep_name, spec))
         
-        pattern = r'^\s*([a-zA-Z0-9_-]+)\s*=\s*(\{[^}]*version[^}]*\}|"[0-9]+(?:\.[0-9]+)*)'
+        return dependencies
+    
+    @staticmethod
+    def extract_line_dependencies(content):
+        """Extract dependencies line by line from partial Cargo.toml content"""
+        dependencies = []
         
-        for line in content.splitlines():
-            if not line.strip() or line.strip().startswith('#'):
+        for match in DEPENDENCY_LINE_RE.finditer(content):
+            dep_name = match.group(1)
+            dep_value = match.group(0)
+            
+            # Skip common package fields that aren't dependencies
+            if dep_name in PACKAGE_FIELDS:
                 continue
             
-            match = re.match(pattern, line)
-            if match:
-                dep_name = match.group(1)
-                dep_value = line
-                
-                # Skip common package fields that aren't dependencies
-                if dep_name in ['name', 'version', 'authors', 'edition', 'description', 
-                               'license', 'repository', 'homepage', 'documentation',
-                               'readme', 'keywords', 'categories', 'build', 'links',
-                               'exclude', 'include', 'publish', 'metadata', 'resolver']:
-                    continue
-                
-                # Skip workspace and path dependencies
-                if 'workspace' in dep_value and 'true' in dep_value:
-                    continue
-                if 'path' in dep_value and '=' in dep_value:
-                    continue
-                
-                version = CargoChecker.extract_version(dep_value)
-                if version:
-                    dependencies.append((dep_name, version))
+            # Skip workspace and path dependencies
+            if 'workspace' in dep_value and 'true' in dep_value:
+                continue
+            if 'path' in dep_value and '=' in dep_value:
+                continue
+            
+            version = CargoChecker.extract_version(dep_value)
+            if version:
+                dependencies.append((dep_name, version))
         
         return dependencies
     
     @staticmethod
-    def check_dependencies(file_path, content):
-        """Check dependencies and return outdated ones"""
+    def check_dependencies(file_path, content, previous_content=None):
+        """Check dependencies and return outdated ones
+        
+        If previous_content is given (the text an edit replaced), dependencies
+        that appear unchanged in it are skipped.
+        """
+        return CargoChecker.find_outdated(CargoChecker.changed_dependencies(file_path, content, previous_content))
+    
+    @staticmethod
+    def changed_dependencies(file_path, content, previous_content=None):
+        """Extract dependencies, skipping any that appear unchanged in previous_content"""
         dependencies = CargoChecker.extract_dependencies(content)
         
+        if dependencies and previous_content:
+            unchanged = set(CargoChecker.extract_dependencies(previous_content))
+            dependencies = [dep for dep in dependencies if dep not in unchanged]
+        
+        return dependencies
+    
+    @staticmethod
+    def find_outdated(dependencies):
+        """Look up the latest version of each dependency and return the outdated ones"""
         if not dependencies:
             return []
         
+        # Lookups are network-bound, so run them concurrently
+        latest_versions = lookup_all(CargoChecker.get_latest_version, (dep_name for dep_name, _ in dependencies))
+        
         outdated = []
         
         for dep_name, current_version in dependencies:
-            latest_version = CargoChecker.get_latest_version(dep_name)
-            
+            latest_version = latest_versions[dep_name]
             if not latest_version:
                 continue
             
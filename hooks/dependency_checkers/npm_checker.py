@@ -4,44 +4,36 @@ package.json dependency checker for Node.js projects.
 
 import re
 import json
-import subprocess
+from urllib.parse import quote
+
+from .registry import fetch_json, lookup_all
+from .version_cache import cached_latest_version
+
+SEMVER_RE = re.compile(r'^\d+\.\d+\.\d+')
+# Range operators (^, ~, >=, <, =, ...) followed by major.minor[.patch], where
+# minor and patch may be wildcards: ^1.2.3, >= 1.2, 1.2.x, 1.*
+BASE_VERSION_RE = re.compile(r'\s*(?:(?:[\^~]|[<>]=?|=)\s*)*(\d+)\.(\d+|[xX*])(?:\.(\d+|[xX*]))?')
+# Single dependency line: "express": "^4.17.1"
+DEPENDENCY_LINE_RE = re.compile(r'"([^"]+)":\s*"([^"]+)"')
 
 
 class NpmChecker:
     """Check Node.js package.json dependencies"""
     
-    @staticmethod
-    def can_handle(file_path):
-        return file_path.endswith('package.json')
-    
     @staticmethod
     def extract_base_version(version_spec):
         """Extract base version from npm version specifiers"""
-        # Remove version range prefixes
-        version_spec = version_spec.strip()
-        
-        # Handle various npm version formats
         # ^1.2.3 -> 1.2.3
         # ~1.2.3 -> 1.2.3
         # >=1.2.3 -> 1.2.3
         # 1.2.x -> 1.2.0
         # 1.2.* -> 1.2.0
-        
-        # Remove common prefixes
-        for prefix in ['^', '~', '>=', '>', '<=', '<', '=']:
-            if version_spec.startswith(prefix):
-                version_spec = version_spec[len(prefix):].strip()
-        
-        # Handle .x or .* endings
-        if version_spec.endswith('.x') or version_spec.endswith('.*'):
-            version_spec = version_spec[:-2] + '.0'
-        
-        # Extract semantic version pattern
-        match = re.match(r'(\d+)\.(\d+)(?:\.(\d+))?', version_spec)
+        match = BASE_VERSION_RE.match(version_spec)
         if match:
-            major = match.group(1)
-            minor = match.group(2)
-            patch = match.group(3) or '0'
+            major, minor, patch = match.groups()
+            # Wildcards stand for the lowest version they allow
+            minor = minor if minor.isdigit() else '0'
+            patch = patch if patch and patch.isdigit() else '0'
             return f"{major}.{minor}.{patch}"
         
         return None
@@ -71,16 +63,42 @@ class NpmChecker:
             return False
     
     @staticmethod
+    @cached_latest_version('npm')
     def get_latest_version(package_name):
+        """Get latest version from the npm registry, falling back to npm view"""
+        return (NpmChecker.get_registry_version(package_name) or
+                NpmChecker.get_npm_view_version(package_name))
+    
+    @staticmethod
+    def get_registry_version(package_name):
+        """Get latest version from the npm registry's dist-tag endpoint"""
+        # Scoped packages keep their '@scope/' prefix in the path
+        data = fetch_json(f'https://registry.npmjs.org/{quote(package_name, safe="@/")}/latest')
+        if not data:
+            return None
+        
+        version = data.get('version', '')
+        if isinstance(version, str) and SEMVER_RE.match(version):
+            return version
+        
+        return None
+    
+    @staticmethod
+    def get_npm_view_version(package_name):
         """Get latest version using npm view"""
+        # Only needed when the registry API is unreachable
+        import subprocess
+        
         try:
             # Handle scoped packages
             package_arg = package_name
             
+            # Keep stdout as bytes - a version string is plain ASCII
             result = subprocess.run(
                 ['npm', 'view', package_arg, 'version', '--json'],
-                capture_output=True,
-                text=True,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 timeout=10
             )
             
@@ -88,10 +106,10 @@ class NpmChecker:
                 return None
             
             # npm view returns JSON string with quotes
-            version = result.stdout.strip().strip('"')
+            version = result.stdout.strip().strip(b'"').decode('ascii', 'ignore')
             
             # Validate it's a version string
-            if re.match(r'^\d+\.\d+\.\d+', version):
+            if SEMVER_RE.match(version):
                 return version
             
             return None
@@ -105,7 +123,7 @@ class NpmChecker:
         content = content.strip()
         if content.startswith('"') and '":' in content and not content.startswith('{'):
             # Parse single dependency line
-            match = re.match(r'"([^"]+)":\s*"([^"]+)"', content)
+            match = DEPENDENCY_LINE_RE.match(content)
             if match:
                 package_name = match.group(1)
                 version_spec = match.group(2)
@@ -149,18 +167,38 @@ class NpmChecker:
         return dependencies
     
     @staticmethod
-    def check_dependencies(file_path, content):
-        """Check dependencies and return outdated ones"""
+    def check_dependencies(file_path, content, previous_content=None):
+        """Check dependencies and return outdated ones
+        
+        If previous_content is given (the text an edit replaced), dependencies
+        that appear unchanged in it are skipped.
+        """
+        return NpmChecker.find_outdated(NpmChecker.changed_dependencies(file_path, content, previous_content))
+    
+    @staticmethod
+    def changed_dependencies(file_path, content, previous_content=None):
+        """Extract dependencies, skipping any that appear unchanged in previous_content"""
         dependencies = NpmChecker.extract_dependencies(content)
         
+        if dependencies and previous_content:
+            unchanged = set(NpmChecker.extract_dependencies(previous_content))
+            dependencies = [dep for dep in dependencies if dep not in unchanged]
+        
+        return dependencies
+    
+    @staticmethod
+    def find_outdated(dependencies):
+        """Look up the latest version of each dependency and return the outdated ones"""
         if not dependencies:
             return []
         
+        # Lookups are network-bound, so run them concurrently
+        latest_versions = lookup_all(NpmChecker.get_latest_version, (dep[0] for dep in dependencies))
+        
         outdated = []
         
         for package_name, current_version, version_spec, dep_type in dependencies:
-            latest_version = NpmChecker.get_latest_version(package_name)
-            
+            latest_version = latest_versions[package_name]
             if not latest_version:
                 continue
             
@@ -8,99 +8,127 @@
 Python dependency checker for requirements.txt, pyproject.toml, and inline script metadata (PEP 723).
 """
 
+import functools
+import itertools
+import os
 import re
-import json
-import subprocess
+from urllib.parse import quote
 
-try:
-    import tomllib
-    HAS_TOML = True
-except ImportError:
-    try:
-        # Python < 3.11
-        import tomli as tomllib
-        HAS_TOML = True
-    except ImportError:
-        # No TOML support available
-        HAS_TOML = False
-        tomllib = None
+from .registry import fetch_json, lookup_all
+from .toml_support import get_tomllib
+from .version_cache import cached_latest_version
+
+# Exact == pins are deliberate, so they aren't checked unless HOOK_CHECK_PINS=true
+CHECK_PINS = os.environ.get('HOOK_CHECK_PINS', '').lower() in ('1', 'true')
+
+# Extractor method for each file suffix the package registers PipChecker for. Matched
+# with endswith rather than looked up by basename, so dev-requirements.txt works too.
+EXTRACTORS = (
+    ('requirements.txt', 'extract_requirements_txt_dependencies'),
+    ('pyproject.toml', 'extract_pyproject_toml_dependencies'),
+    ('.py', 'extract_inline_script_dependencies'),
+)
+
+# package[extra]>=1.0.0 -> (package, >=1.0.0)
+REQUIREMENT_RE = re.compile(r'^([a-zA-Z0-9_.-]+)(?:\[[^\]]+\])?\s*([><=~!]+.*)$')
+# Bare package name at the start of a dependency string
+PACKAGE_NAME_RE = re.compile(r'^([a-zA-Z0-9_.-]+)')
+# Leading operator and major[.minor[.patch]] of a specifier such as ">= 1.2.3,<2.0"
+VERSION_SPEC_RE = re.compile(r'\s*(?:==|>=|<=|~=|!=|>|<)?\s*(\d+)(?:\.(\d+))?(?:\.(\d+))?')
+# First double-quoted string on a line
+QUOTED_RE = re.compile(r'"([^"]+)"')
+# PEP 723 metadata block, from "# /// script" to "# ///" (or the end of an unterminated fragment)
+SCRIPT_METADATA_RE = re.compile(
+    r'^[^\S\n]*# /// script[^\S\n]*$(.*?)(?:^[^\S\n]*# ///[^\S\n]*$|\Z)',
+    re.MULTILINE | re.DOTALL
+)
+# Comment line inside the metadata block, without its leading '#'
+METADATA_LINE_RE = re.compile(r'^#(.*)$', re.MULTILINE)
+# URLs, direct references (pkg @ url), editable installs and local paths
+# anywhere in a requirements.txt line or PEP 508 string
+DEPENDENCY_URL_RE = re.compile(r'http://|https://|git\+|file://|-e |[@/\\]')
 
 
 class PipChecker:
     """Check Python dependencies in various formats"""
     
-    @staticmethod
-    def can_handle(file_path):
-        return (file_path.endswith('requirements.txt') or 
-                file_path.endswith('pyproject.toml') or 
-                file_path.endswith('.py'))
-    
     @staticmethod
     def parse_version_spec(version_spec):
         """Parse Python version specifiers and extract base version"""
-        version_spec = version_spec.strip()
-        
-        # Handle common prefixes
-        for prefix in ['==', '>=', '<=', '~=', '>', '<', '!=']:
-            if version_spec.startswith(prefix):
-                version_spec = version_spec[len(prefix):].strip()
-                break
-        
-        # Remove any additional constraints (e.g., "1.2.3,<2.0")
-        if ',' in version_spec:
-            version_spec = version_spec.split(',')[0].strip()
-        
-        # Extract semantic version pattern
-        match = re.match(r'(\d+)(?:\.(\d+))?(?:\.(\d+))?', version_spec)
+        # Only the first constraint counts: "1.2.3,<2.0" -> 1.2.3
+        match = VERSION_SPEC_RE.match(version_spec)
         if match:
-            major = match.group(1)
-            minor = match.group(2) or '0'
-            patch = match.group(3) or '0'
-            return f"{major}.{minor}.{patch}"
+            major, minor, patch = match.groups()
+            return f"{major}.{minor or '0'}.{patch or '0'}"
         
         return None
     
+    @staticmethod
+    def is_pinned(version_spec):
+        """Check if a specifier pins one exact version (==1.2.3 or ===1.2.3, not ==1.2.*)"""
+        return version_spec.startswith('==') and '*' not in version_spec
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def version_key(version):
+        """Major and minor parts of a version as ints (None where not numeric), parsed once per string"""
+        return tuple(int(part) if part.isdecimal() else None for part in version.split('.')[:2])
+    
     @staticmethod
     def is_major_bump(current, latest):
         """Check if it's a major version bump"""
-        try:
-            current_parts = current.split('.')
-            latest_parts = latest.split('.')
-            
-            current_major = int(current_parts[0])
-            latest_major = int(latest_parts[0])
-            
-            if current_major != latest_major:
-                return True
-            
-            # For 0.x versions, minor bumps are breaking
-            if current_major == 0 and len(current_parts) > 1 and len(latest_parts) > 1:
-                current_minor = int(current_parts[1])
-                latest_minor = int(latest_parts[1])
-                if current_minor != latest_minor:
-                    return True
-            
-            return False
-        except (ValueError, IndexError):
+        current_parts = PipChecker.version_key(current)
+        latest_parts = PipChecker.version_key(latest)
+        
+        current_major, latest_major = current_parts[0], latest_parts[0]
+        if current_major is None or latest_major is None:
             return False
+        
+        if current_major != latest_major:
+            return True
+        
+        # For 0.x versions, minor bumps are breaking
+        if current_major == 0 and len(current_parts) > 1 and len(latest_parts) > 1:
+            current_minor, latest_minor = current_parts[1], latest_parts[1]
+            return None not in (current_minor, latest_minor) and current_minor != latest_minor
+        
+        return False
     
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def check_uv_available():
         """Check if uv command is available"""
-        try:
-            result = subprocess.run(
-                ['uv', '--version'],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            return result.returncode == 0
-        except Exception:
-            return False
+        # A PATH lookup rather than running uv --version; the answer is fixed for the run
+        import shutil
+        
+        return shutil.which('uv') is not None
     
     @staticmethod
+    @cached_latest_version('pypi')
     def get_latest_version(package_name):
+        """Get latest version from the PyPI JSON API, falling back to uv or pip"""
+        return (PipChecker.get_registry_version(package_name) or
+                PipChecker.get_installer_version(package_name))
+    
+    @staticmethod
+    def get_registry_version(package_name):
+        """Get latest version from the PyPI JSON API"""
+        data = fetch_json(f'https://pypi.org/pypi/{quote(package_name)}/json')
+        if not data:
+            return None
+        
+        version = data.get('info', {}).get('version')
+        if isinstance(version, str) and version:
+            return version
+        
+        return None
+    
+    @staticmethod
+    def get_installer_version(package_name):
         """Get latest version using uv or pip"""
+        # Only needed when PyPI is unreachable
+        import subprocess
+        
         # First try with uv if available
         if PipChecker.check_uv_available():
             try:
@@ -163,41 +191,57 @@ class PipChecker:
             return None
     
     @staticmethod
-    def extract_requirements_txt_dependencies(content):
-        """Extract dependencies from requirements.txt content"""
-        dependencies = []
+    def parse_dependency(dep, dep_type, allow_bare=False):
+        """Parse a single requirement string such as package[extra]>=1.0.0
         
-        for line in content.splitlines():
-            line = line.strip()
-            
-            # Skip empty lines and comments
-            if not line or line.startswith('#'):
-                continue
-            
-            # Skip URLs and local paths
-            if any(prefix in line for prefix in ['http://', 'https://', 'git+', 'file://', '-e ', '/', '\\']):
-                continue
-            
-            # Parse package spec
-            # Handle various formats: package==1.0.0, package>=1.0.0, package[extra]>=1.0.0
-            match = re.match(r'^([a-zA-Z0-9_.-]+)(?:\[[^\]]+\])?\s*([><=~!]+.*)$', line)
+        Returns (name, base_version, version_spec, dep_type), or None for URLs,
+        local paths and unversioned requirements. With allow_bare, a bare
+        package name is returned with base version '0.0.0'.
+        """
+        # Skip URLs and local paths
+        if DEPENDENCY_URL_RE.search(dep):
+            return None
+        
+        # Handle various formats: package==1.0.0, package>=1.0.0, package[extra]>=1.0.0
+        match = REQUIREMENT_RE.match(dep)
+        if match:
+            package_name, version_spec = match.groups()
+            base_version = PipChecker.parse_version_spec(version_spec)
+            if base_version:
+                return (package_name, base_version, version_spec, dep_type)
+            return None
+        
+        if allow_bare:
+            # Handle bare package names
+            match = PACKAGE_NAME_RE.match(dep)
             if match:
-                package_name = match.group(1)
-                version_spec = match.group(2)
-                base_version = PipChecker.parse_version_spec(version_spec)
-                if base_version:
-                    dependencies.append((package_name, base_version, version_spec, 'requirements'))
+                return (match.group(1), '0.0.0', '', dep_type)
         
+        return None
+    
+    @staticmethod
+    def parse_dependency_list(deps, dep_type, allow_bare=False):
+        """Parse a list of requirement strings, dropping the ones that don't parse"""
+        dependencies = []
+        for dep in deps:
+            dependency = PipChecker.parse_dependency(dep, dep_type, allow_bare)
+            if dependency:
+                dependencies.append(dependency)
         return dependencies
     
+    @staticmethod
+    def extract_requirements_txt_dependencies(content):
+        """Extract dependencies from requirements.txt content"""
+        lines = (line.strip() for line in content.splitlines())
+        # Skip empty lines and comments
+        return PipChecker.parse_dependency_list(
+            (line for line in lines if line and not line.startswith('#')),
+            'requirements'
+        )
+    
     @staticmethod
     def extract_pyproject_toml_dependencies(content):
         """Extract dependencies from pyproject.toml content"""
-        if not HAS_TOML:
-            return []
-            
-        dependencies = []
-        
         # Handle single line edits (e.g., "click==8.0.0",) or multiple lines from MultiEdit
         content = content.strip()
         # Check if this looks like dependency lines (quotes and version specifiers)
@@ -209,69 +253,36 @@ class PipChecker:
         )
         
         if is_deps:
-            dependencies = []
             # Handle multiple lines (from MultiEdit)
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                # Parse single dependency line
-                match = re.match(r'"([^"]+)"', line)
-                if match:
-                    dep = match.group(1)
-                    # Parse dependency spec
-                    match2 = re.match(r'^([a-zA-Z0-9_.-]+)(?:\[[^\]]+\])?\s*([><=~!]+.*)$', dep)
-                    if match2:
-                        package_name = match2.group(1)
-                        version_spec = match2.group(2)
-                        base_version = PipChecker.parse_version_spec(version_spec)
-                        if base_version:
-                            dependencies.append((package_name, base_version, version_spec, 'unknown'))
-            return dependencies
+            quoted = (QUOTED_RE.match(line.strip()) for line in lines)
+            return PipChecker.parse_dependency_list(
+                (match.group(1) for match in quoted if match),
+                'unknown'
+            )
+        
+        tomllib = get_tomllib()
+        if tomllib is None:
+            return []
         
         try:
             data = tomllib.loads(content)
         except Exception:
             return []
         
-        # Extract from [project] dependencies
+        # Extract from [project] dependencies and [project.optional-dependencies] in one pass
         project = data.get('project', {})
-        deps = project.get('dependencies', [])
-        
-        for dep in deps:
-            # Skip URLs and local paths
-            if any(prefix in dep for prefix in ['http://', 'https://', 'git+', 'file://', '@', '/', '\\']):
-                continue
-            
-            # Parse dependency spec
-            match = re.match(r'^([a-zA-Z0-9_.-]+)(?:\[[^\]]+\])?\s*([><=~!]+.*)$', dep)
-            if match:
-                package_name = match.group(1)
-                version_spec = match.group(2)
-                base_version = PipChecker.parse_version_spec(version_spec)
-                if base_version:
-                    dependencies.append((package_name, base_version, version_spec, 'project'))
-            else:
-                # Handle bare package names
-                match = re.match(r'^([a-zA-Z0-9_.-]+)', dep)
-                if match:
-                    package_name = match.group(1)
-                    dependencies.append((package_name, '0.0.0', '', 'project'))
-        
-        # Extract from [project.optional-dependencies]
         optional_deps = project.get('optional-dependencies', {})
-        for group_name, group_deps in optional_deps.items():
-            for dep in group_deps:
-                if any(prefix in dep for prefix in ['http://', 'https://', 'git+', 'file://', '@', '/', '\\']):
-                    continue
-                
-                match = re.match(r'^([a-zA-Z0-9_.-]+)(?:\[[^\]]+\])?\s*([><=~!]+.*)$', dep)
-                if match:
-                    package_name = match.group(1)
-                    version_spec = match.group(2)
-                    base_version = PipChecker.parse_version_spec(version_spec)
-                    if base_version:
-                        dependencies.append((package_name, base_version, version_spec, f'optional[{group_name}]'))
+        tagged_deps = itertools.chain(
+            (('project', dep) for dep in project.get('dependencies', [])),
+            ((f'optional[{group_name}]', dep)
+             for group_name, group_deps in optional_deps.items() for dep in group_deps),
+        )
+        
+        dependencies = []
+        for dep_type, dep in tagged_deps:
+            dependency = PipChecker.parse_dependency(dep, dep_type, allow_bare=True)
+            if dependency:
+                dependencies.append(dependency)
         
         # Note: Skip [tool.uv.sources] as those are alternative sources, not versions
         
@@ -280,33 +291,24 @@ class PipChecker:
     @staticmethod
     def extract_inline_script_dependencies(content):
         """Extract dependencies from Python script with PEP 723 inline metadata"""
-        if not HAS_TOML:
-            return []
-            
-        dependencies = []
-        
         # Look for the PEP 723 metadata block
         # Format: # /// script
         #         # dependencies = ["package>=1.0.0"]
         #         # ///
+        match = SCRIPT_METADATA_RE.search(content)
+        if not match:
+            return []
         
-        in_metadata_block = False
-        metadata_lines = []
-        
-        for line in content.splitlines():
-            if line.strip() == '# /// script':
-                in_metadata_block = True
-                continue
-            elif line.strip() == '# ///' and in_metadata_block:
-                break
-            elif in_metadata_block and line.startswith('#'):
-                # Remove the comment prefix
-                metadata_lines.append(line[1:].strip())
-        
+        # Remove the comment prefix
+        metadata_lines = [line.strip() for line in METADATA_LINE_RE.findall(match.group(1))]
         if not metadata_lines:
             return []
         
         # Parse the metadata as TOML
+        tomllib = get_tomllib()
+        if tomllib is None:
+            return []
+        
         metadata_content = '\n'.join(metadata_lines)
         try:
             metadata = tomllib.loads(metadata_content)
@@ -314,56 +316,57 @@ class PipChecker:
             return []
         
         # Extract dependencies
-        deps = metadata.get('dependencies', [])
-        for dep in deps:
-            # Skip URLs and local paths
-            if any(prefix in dep for prefix in ['http://', 'https://', 'git+', 'file://', '@', '/', '\\']):
-                continue
-            
-            # Parse dependency spec
-            match = re.match(r'^([a-zA-Z0-9_.-]+)(?:\[[^\]]+\])?\s*([><=~!]+.*)$', dep)
-            if match:
-                package_name = match.group(1)
-                version_spec = match.group(2)
-                base_version = PipChecker.parse_version_spec(version_spec)
-                if base_version:
-                    dependencies.append((package_name, base_version, version_spec, 'inline'))
-            else:
-                # Handle bare package names
-                match = re.match(r'^([a-zA-Z0-9_.-]+)', dep)
-                if match:
-                    package_name = match.group(1)
-                    dependencies.append((package_name, '0.0.0', '', 'inline'))
-        
-        return dependencies
+        return PipChecker.parse_dependency_list(
+            metadata.get('dependencies', []), 'inline', allow_bare=True
+        )
     
     @staticmethod
     def extract_dependencies(file_path, content):
         """Extract dependencies based on file type"""
-        if file_path.endswith('requirements.txt'):
-            return PipChecker.extract_requirements_txt_dependencies(content)
-        elif file_path.endswith('pyproject.toml'):
-            return PipChecker.extract_pyproject_toml_dependencies(content)
-        elif file_path.endswith('.py'):
-            return PipChecker.extract_inline_script_dependencies(content)
+        for suffix, extractor in EXTRACTORS:
+            if file_path.endswith(suffix):
+                return getattr(PipChecker, extractor)(content)
         return []
     
     @staticmethod
-    def check_dependencies(file_path, content):
-        """Check dependencies and return outdated ones"""
+    def check_dependencies(file_path, content, previous_content=None):
+        """Check dependencies and return outdated ones
+        
+        If previous_content is given (the text an edit replaced), dependencies
+        that appear unchanged in it are skipped.
+        """
+        return PipChecker.find_outdated(PipChecker.changed_dependencies(file_path, content, previous_content))
+    
+    @staticmethod
+    def changed_dependencies(file_path, content, previous_content=None):
+        """Extract dependencies, skipping any that appear unchanged in previous_content"""
         dependencies = PipChecker.extract_dependencies(file_path, content)
         
+        if dependencies and previous_content:
+            unchanged = set(PipChecker.extract_dependencies(file_path, previous_content))
+            dependencies = [dep for dep in dependencies if dep not in unchanged]
+        
+        return dependencies
+    
+    @staticmethod
+    def find_outdated(dependencies):
+        """Look up the latest version of each dependency and return the outdated ones"""
         if not dependencies:
             return []
         
+        # Skip dependencies without a version, and exact pins, before any lookup happens
+        dependencies = [dep for dep in dependencies
+                        if dep[1] != '0.0.0' and (CHECK_PINS or not PipChecker.is_pinned(dep[2]))]
+        if not dependencies:
+            return []
+        
+        # Lookups run concurrently, and a package listed in several groups is only looked up once
+        latest_versions = lookup_all(PipChecker.get_latest_version, (dep[0] for dep in dependencies))
+        
         outdated = []
         
         for package_name, current_version, version_spec, dep_type in dependencies:
-            # Skip if no version was specified
-            if current_version == '0.0.0':
-                continue
-                
-            latest_version = PipChecker.get_latest_version(package_name)
+            latest_version = latest_versions[package_name]
             
             if not latest_version:
                 continue
@@ -0,0 +1,120 @@
+"""
+Minimal JSON-over-HTTPS client for package registry lookups.
+
+Connections are kept alive and reused per registry host, so checking N
+dependencies costs one TLS handshake per worker thread instead of N.
+lookup_all runs a checker's lookups for a batch of packages concurrently.
+"""
+
+import atexit
+import http.client
+import json
+import threading
+import urllib.parse
+import urllib.request
+import zlib
+
+# crates.io rejects requests without a descriptive User-Agent
+USER_AGENT = 'claude-code-gists-dependency-checker (https://github.com/pauloportella/claude-code-gists)'
+
+# Upper bound on concurrent registry lookups
+MAX_WORKERS = 16
+
+# HTTPSConnection isn't thread-safe, so each worker thread keeps its own per host
+_local = threading.local()
+_connections_lock = threading.Lock()
+_connections = []  # Every open connection, closed at exit
+
+
+def _new_connection(host, timeout):
+    proxy = urllib.request.getproxies().get('https')
+    if proxy and not urllib.request.proxy_bypass(host):
+        proxy_url = urllib.parse.urlsplit(proxy if '://' in proxy else f'http://{proxy}')
+        # A proxy URL without a port uses its scheme's default, e.g. http://proxy -> 80
+        port = proxy_url.port or (443 if proxy_url.scheme == 'https' else 80)
+        connection = http.client.HTTPSConnection(proxy_url.hostname, port, timeout=timeout)
+        connection.set_tunnel(host)
+    else:
+        connection = http.client.HTTPSConnection(host, timeout=timeout)
+
+    with _connections_lock:
+        if not _connections:
+            atexit.register(_close_all)
+        _connections.append(connection)
+    return connection
+
+
+def _get_connection(host, timeout):
+    """Return this thread's connection to host and whether it was used before"""
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    connection = connections.get(host)
+    if connection is not None:
+        return connection, True
+    connection = connections[host] = _new_connection(host, timeout)
+    return connection, False
+
+
+def _drop_connection(host):
+    connection = _local.connections.pop(host, None)
+    if connection is not None:
+        connection.close()
+
+
+def _close_all():
+    with _connections_lock:
+        for connection in _connections:
+            connection.close()
+        _connections.clear()
+
+
+def fetch_json(url, timeout=5):
+    """Fetch and decode a JSON document, returning None on any failure"""
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    headers = {
+        'User-Agent': USER_AGENT,
+        'Accept': 'application/json',
+        # PyPI's per-project documents list every release and compress very well
+        'Accept-Encoding': 'gzip',
+    }
+
+    while True:
+        try:
+            connection, reused = _get_connection(parts.netloc, timeout)
+        except Exception:
+            return None
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            # The body must be read in full before the connection can be reused
+            body = response.read()
+            if response.status != 200:
+                return None
+            if response.getheader('Content-Encoding', '').lower() == 'gzip':
+                body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            return json.loads(body)
+        except Exception:
+            _drop_connection(parts.netloc)
+            # The server may have closed an idle keep-alive connection; retry once on a fresh one
+            if not reused:
+                return None
+
+
+def lookup_all(lookup, names):
+    """Run lookup(name) once per distinct name, concurrently
+
+    Returns a dict of name to result. Lookups are network-bound, so a thread
+    pool waits on them in parallel; a single name is looked up inline.
+    """
+    names = list(dict.fromkeys(names))
+    if len(names) <= 1:
+        return {name: lookup(name) for name in names}
+
+    # Imported here because it's slow to import and most hook runs never need it
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(names))) as executor:
+        return dict(zip(names, executor.map(lookup, names)))
@@ -0,0 +1,22 @@
+"""
+Lazily loaded TOML parser shared by the checkers.
+
+tomllib takes longer to import than the rest of a checker, and most hook runs
+never parse TOML, so it's only imported on first use.
+"""
+
+import functools
+
+
+@functools.lru_cache(maxsize=1)
+def get_tomllib():
+    """Return tomllib (or tomli on Python < 3.11), or None if neither is available"""
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            # Python < 3.11
+            import tomli as tomllib
+        except ImportError:
+            return None
+    return tomllib
@@ -0,0 +1,100 @@
+"""
+On-disk TTL cache for latest-version lookups, shared by all checkers.
+
+Entries live in ~/.cache/claude-hooks/versions.json keyed by "<ecosystem>:<name>".
+The file is read lazily on the first lookup and written back once at exit, so a
+hook run that hits only cached entries never touches the network.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows - concurrent writers may then drop each other's entries
+    fcntl = None
+
+CACHE_PATH = os.path.expanduser('~/.cache/claude-hooks/versions.json')
+LOCK_PATH = f'{CACHE_PATH}.lock'
+TTL_SECONDS = 6 * 60 * 60
+
+_lock = threading.Lock()
+_entries = None  # In-process copy of the file: {key: [timestamp, version]}
+_updates = {}    # Entries fetched during this run, flushed at exit
+
+
+def _read_cache_file():
+    try:
+        with open(CACHE_PATH, 'r') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _is_fresh(entry, now):
+    """Check that a cache entry is a well-formed [timestamp, version] pair within the TTL"""
+    return (isinstance(entry, list) and len(entry) == 2 and
+            isinstance(entry[0], (int, float)) and isinstance(entry[1], str) and
+            now - entry[0] < TTL_SECONDS)
+
+
+def _load_entries():
+    global _entries
+    if _entries is None:
+        _entries = _read_cache_file()
+        atexit.register(_flush)
+    return _entries
+
+
+def _flush():
+    """Merge this run's lookups into the cache file and replace it atomically"""
+    if not _updates:
+        return
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(LOCK_PATH, 'a') as lock_file:
+            # Serialize read-merge-write across concurrent hook runs; released on close
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            # Re-read so entries written by concurrent hook runs are kept
+            entries = _read_cache_file()
+            entries.update(_updates)
+            now = time.time()
+            entries = {key: entry for key, entry in entries.items() if _is_fresh(entry, now)}
+
+            tmp_path = f'{CACHE_PATH}.{os.getpid()}.tmp'
+            # json.dumps encodes in one C call; json.dump streams small chunks from Python
+            with open(tmp_path, 'w') as f:
+                f.write(json.dumps(entries, separators=(',', ':')))
+            os.replace(tmp_path, CACHE_PATH)
+    except OSError:
+        pass
+
+
+def cached_latest_version(ecosystem):
+    """Decorate a get_latest_version(name) function with the shared TTL cache"""
+    def decorator(fetch):
+        @functools.wraps(fetch)
+        def wrapper(name):
+            key = f'{ecosystem}:{name}'
+            with _lock:
+                entry = _load_entries().get(key)
+            # The file may hold anything; a malformed entry is just a miss
+            if _is_fresh(entry, time.time()):
+                return entry[1]
+
+            version = fetch(name)
+            # Failed lookups aren't cached so the next run retries them
+            if version:
+                with _lock:
+                    _entries[key] = _updates[key] = [time.time(), version]
+            return version
+        return wrapper
+    return decorator
@@ -39,40 +39,62 @@ BLOCKED_PATHS = [
     'kubeconfig',
 ]
 
+# Lowercased once at import: a path is blocked if it contains an entry, or ends
+# with one minus its trailing slash (so '.aws/' also blocks the .aws directory)
+BLOCKED_SUBSTRINGS = tuple(blocked.lower() for blocked in BLOCKED_PATHS)
+BLOCKED_SUFFIXES = tuple(blocked.lower().rstrip('/') for blocked in BLOCKED_PATHS)
+
 def is_sensitive_path(file_path):
     """Check if path should be blocked"""
     path = os.path.normpath(file_path).lower()
     
-    for blocked in BLOCKED_PATHS:
-        blocked_lower = blocked.lower()
-        # Check if path contains or ends with blocked pattern
-        if blocked_lower in path or path.endswith(blocked_lower.rstrip('/')):
-            return True
-    
-    return False
+    # Check if path contains or ends with blocked pattern
+    return path.endswith(BLOCKED_SUFFIXES) or any(blocked in path for blocked in BLOCKED_SUBSTRINGS)
+
+# Hook output when access is allowed
+EMPTY_RESULT = b'{}\n'
+
+# orjson parses faster but takes ~6 ms longer to import than json, so it only
+# pays off for very large inputs (e.g. a Write of a huge file)
+ORJSON_MIN_BYTES = 8 * 1024 * 1024
+
+def read_hook_input():
+    """Read and parse the hook's JSON input as bytes, skipping text decoding"""
+    data = sys.stdin.buffer.read()
+    if len(data) >= ORJSON_MIN_BYTES:
+        try:
+            import orjson
+            return orjson.loads(data)
+        except ImportError:
+            pass
+    return json.loads(data)
+
+def write_hook_output(result):
+    """Write a hook result as one line of JSON"""
+    sys.stdout.buffer.write(json.dumps(result).encode() + b'\n')
 
 def main():
     try:
-        input_data = json.load(sys.stdin)
+        input_data = read_hook_input()
         tool_name = input_data.get('tool_name', '')
         
         # Only check Read/Write operations
         if tool_name not in ['Read', 'Write']:
-            print(json.dumps({}))
-            sys.exit(0)
+            sys.stdout.buffer.write(EMPTY_RESULT)
+            return
         
         file_path = input_data.get('tool_input', {}).get('file_path', '')
         
         if is_sensitive_path(file_path):
-            print(json.dumps({
+            write_hook_output({
                 "decision": "block",
                 "reason": f"🚫 Access denied: '{file_path}' contains sensitive data"
-            }))
+            })
         else:
-            print(json.dumps({}))
+            sys.stdout.buffer.write(EMPTY_RESULT)
             
-    except:
-        print(json.dumps({}))
+    except Exception:
+        sys.stdout.buffer.write(EMPTY_RESULT)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
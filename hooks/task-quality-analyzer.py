@@ -14,15 +14,26 @@ import sys
 import subprocess
 import re
 import os
+import hashlib
+import time
 
 # Enable debug logging with HOOK_DEBUG=true environment variable
 DEBUG = os.environ.get('HOOK_DEBUG', '').lower() == 'true'
 
-# Claude prompt for analyzing task quality
-QUALITY_PROMPT = """Analyze this Task tool request for quality and clarity:
+# Claude runs from its own directory so hook sessions stay out of project history
+CLAUDE_DIR = os.path.expanduser('~/.claude')
+HOOKS_CLAUDE_DIR = os.path.join(CLAUDE_DIR, 'hooks-using-claude')
+CLAUDE_PATH = os.path.join(CLAUDE_DIR, 'local', 'claude')
 
-Description: "{description}"
-Task Instructions: "{prompt}"
+# Reuse verdicts for repeated tasks with HOOK_QUALITY_CACHE=true. Opt-in because
+# Claude can judge the same task differently from one run to the next.
+QUALITY_CACHE = os.environ.get('HOOK_QUALITY_CACHE', '').lower() in ('1', 'true')
+QUALITY_CACHE_DIR = os.path.expanduser('~/.cache/claude-hooks/task-quality')
+QUALITY_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Claude prompt for analyzing task quality. The task is appended after it as
+# JSON strings, so the instructions are the same constant text on every call.
+QUALITY_PROMPT = """Analyze the Task tool request below for quality and clarity.
 
 Evaluate:
 1. Specificity: Is the task clearly defined with specific goals?
@@ -32,33 +43,37 @@ Evaluate:
 5. Efficiency: Should this use Task tool or simpler tools (Read, Grep, etc)?
 
 Respond with ONLY valid JSON (no markdown, no explanation):
-{{
+{
   "quality": "good" or "poor",
   "issues": ["list", "of", "specific", "issues"] or [],
   "suggestion": "one line improvement suggestion if poor, empty string if good"
-}}"""
+}
+
+Task tool request:
+"""
+
+# Fallbacks for output that isn't bare JSON: a ```json block, then any {...} span
+JSON_BLOCK_RE = re.compile(r'```json\s*(\{.*?\})\s*```', re.DOTALL)
+JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
 
 def analyze_with_claude(description, prompt):
     """Use claude -p to analyze task quality"""
-    analysis_prompt = QUALITY_PROMPT.format(
-        description=description.replace('"', '\\"'),
-        prompt=prompt.replace('"', '\\"')
+    # json.dumps quotes and escapes the task text properly, newlines and all
+    analysis_prompt = (
+        f"{QUALITY_PROMPT}Description: {json.dumps(description, ensure_ascii=False)}\n"
+        f"Task Instructions: {json.dumps(prompt, ensure_ascii=False)}"
     )
     
     try:
-        # Save current directory and change to hooks isolation directory
-        original_cwd = os.getcwd()
-        hooks_claude_dir = os.path.expanduser('~/.claude/hooks-using-claude')
-        os.chdir(hooks_claude_dir)
-        
-        # Run claude in pipe mode with timeout, isolated from project sessions
-        claude_path = os.path.expanduser('~/.claude/local/claude')
+        # Run claude in pipe mode with timeout, isolated from project sessions.
+        # It runs from the hooks isolation directory, so this process never changes directory.
         result = subprocess.run(
-            [claude_path, '-p', '--model', 'sonnet', '--add-dir', original_cwd],
+            [CLAUDE_PATH, '-p', '--model', 'sonnet', '--add-dir', os.getcwd()],
             input=analysis_prompt,
             capture_output=True,
             text=True,
-            timeout=10
+            timeout=10,
+            cwd=HOOKS_CLAUDE_DIR
         )
         
         if result.returncode == 0:
@@ -67,8 +82,16 @@ def analyze_with_claude(description, prompt):
             if DEBUG:
                 print(f"Claude raw output: {output}", file=sys.stderr)
             
-            # First try to extract from ```json blocks
-            json_block = re.search(r'```json\s*(\{.*?\})\s*```', output, re.DOTALL)
+            # The prompt asks for bare JSON, so try that before any regex scan
+            try:
+                analysis = json.loads(output)
+                if isinstance(analysis, dict):
+                    return analysis
+            except json.JSONDecodeError:
+                pass
+            
+            # Then try to extract from ```json blocks
+            json_block = JSON_BLOCK_RE.search(output)
             if json_block:
                 try:
                     extracted = json_block.group(1)
@@ -80,7 +103,7 @@ def analyze_with_claude(description, prompt):
                         print(f"JSON decode error from code block: {e}", file=sys.stderr)
             
             # Fallback: try to find any JSON object
-            json_match = re.search(r'\{.*\}', output, re.DOTALL)
+            json_match = JSON_OBJECT_RE.search(output)
             if json_match:
                 try:
                     extracted = json_match.group()
@@ -96,20 +119,46 @@ def analyze_with_claude(description, prompt):
         
         return None
             
-    except (subprocess.TimeoutExpired, json.JSONDecodeError, Exception):
-        # If analysis fails, err on the side of allowing the task
+    except Exception:
+        # If analysis fails (including a timeout - subprocess.run kills claude
+        # before raising), err on the side of allowing the task
+        return None
+
+def quality_cache_path(description, prompt):
+    """Cache file for a task, keyed by a hash of its description and prompt"""
+    key = hashlib.sha256(f"{description}\x00{prompt}".encode()).hexdigest()
+    return os.path.join(QUALITY_CACHE_DIR, f"{key}.json")
+
+def load_cached_analysis(cache_path):
+    """Return the cached analysis if there is one and it hasn't expired"""
+    try:
+        if time.time() - os.path.getmtime(cache_path) > QUALITY_CACHE_TTL:
+            return None
+        with open(cache_path, 'r') as f:
+            analysis = json.load(f)
+        return analysis if isinstance(analysis, dict) else None
+    except (OSError, ValueError):
         return None
-    finally:
-        # Always restore original working directory
-        try:
-            os.chdir(original_cwd)
-        except:
-            pass
+
+def save_cached_analysis(cache_path, analysis):
+    """Write an analysis to the cache atomically"""
+    try:
+        os.makedirs(QUALITY_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(json.dumps(analysis, separators=(',', ':')))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+def write_hook_output(result):
+    """Write a hook result as one line of JSON"""
+    sys.stdout.buffer.write(json.dumps(result).encode() + b'\n')
 
 def main():
     try:
         # Read hook input from stdin
-        data = json.loads(sys.stdin.read())
+        data = json.loads(sys.stdin.buffer.read())
         tool_input = data.get('tool_input', {})
         
         description = tool_input.get('description', '').strip()
@@ -117,29 +166,38 @@ def main():
         
         # Quick pre-checks before calling Claude
         if not description or not prompt:
-            print(json.dumps({
+            write_hook_output({
                 "decision": "block",
                 "reason": "🚫 Task requires both description and prompt"
-            }))
+            })
             return
         
         # Check for obvious issues
         if len(description) < 3:
-            print(json.dumps({
+            write_hook_output({
                 "decision": "block",
                 "reason": "🚫 Task description too short. Use 3-5 descriptive words."
-            }))
+            })
             return
             
         if len(prompt) < 20:
-            print(json.dumps({
+            write_hook_output({
                 "decision": "block",
                 "reason": "🚫 Task instructions too brief. Provide clear, specific instructions."
-            }))
+            })
             return
         
-        # Use Claude to analyze task quality
-        analysis = analyze_with_claude(description, prompt)
+        # Use Claude to analyze task quality, unless the same task was analyzed recently
+        analysis = None
+        if QUALITY_CACHE:
+            cache_path = quality_cache_path(description, prompt)
+            analysis = load_cached_analysis(cache_path)
+        
+        if analysis is None:
+            analysis = analyze_with_claude(description, prompt)
+            # Failed analyses aren't cached so the next run retries them
+            if QUALITY_CACHE and isinstance(analysis, dict):
+                save_cached_analysis(cache_path, analysis)
         
         if analysis and analysis.get('quality') == 'poor':
             # Build block message from issues
@@ -153,18 +211,18 @@ def main():
             if suggestion:
                 block_message += f"\n💡 Suggestion: {suggestion}"
             
-            print(json.dumps({
+            write_hook_output({
                 "decision": "block",
                 "reason": block_message
-            }))
+            })
         else:
             # Task is good or analysis failed - allow it
-            print(json.dumps({}))
+            write_hook_output({})
             
     except Exception as e:
         # On any error, allow task to proceed
         # Could log error for debugging: f"Hook error: {e}"
-        print(json.dumps({}))
+        write_hook_output({})
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -11,20 +11,58 @@ from polluting your main project session history. The --add-dir parameter ensure
 Claude still has access to your project files while keeping hook operations separate.
 """
 
-import json
 import sys
-import subprocess
-import re
 import os
-from datetime import datetime
+import time
 
 # Enable debug logging with HOOK_DEBUG=true environment variable
 DEBUG = os.environ.get('HOOK_DEBUG', '').lower() == 'true'
 
-# Prompt for improving user prompts with improv: prefix (Sonnet)
+# Hook output when the prompt is left alone. Written as a literal, so ordinary
+# prompts are answered without importing json at all.
+EMPTY_RESULT = '{}\n'
+
+# Claude runs from its own directory so hook sessions stay out of project history
+CLAUDE_DIR = os.path.expanduser('~/.claude')
+HOOKS_CLAUDE_DIR = os.path.join(CLAUDE_DIR, 'hooks-using-claude')
+CLAUDE_PATH = os.path.join(CLAUDE_DIR, 'local', 'claude')
+
+# Give up on Claude after ENHANCE_TIMEOUT seconds. A timeout opens a circuit
+# that skips enhancement for CIRCUIT_OPEN_SECONDS, so a slow or unreachable
+# Claude stalls one prompt rather than every prompt after it.
+ENHANCE_TIMEOUT = 10
+CIRCUIT_FILE = os.path.join(HOOKS_CLAUDE_DIR, 'enhance_circuit_open')
+CIRCUIT_OPEN_SECONDS = 60
+
+# Reuse enhancements for repeated prompts with HOOK_ENHANCE_CACHE=true. Opt-in
+# because a cached enhancement ignores the conversation context of later runs.
+ENHANCE_CACHE = os.environ.get('HOOK_ENHANCE_CACHE', '').lower() in ('1', 'true')
+ENHANCE_CACHE_DIR = os.path.expanduser('~/.cache/claude-hooks/prompt-enhance')
+ENHANCE_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Markdown code fence lines Claude sometimes wraps its answer in. Patterns are
+# kept as strings so ordinary prompts, which never get this far, skip importing re.
+FENCE_OPEN_PATTERN = r'(?m)^```.*\n'
+FENCE_CLOSE_PATTERN = r'\n```$'
+
+# Phrases from enhancement prompts; a prompt containing one is our own output
+RECURSION_PATTERNS = (
+    "Improve this user prompt by removing ambiguity",
+    "You are an expert prompt engineer",
+    "Apply Anthropic's prompt engineering best practices",
+    "Return ONLY the enhanced prompt text",
+    "Original prompt:",
+    "Your task:",
+    "Fix typos and improve clarity while preserving",
+    "Return ONLY the improved prompt text",
+)
+
+# Prompt for improving user prompts with improv: prefix (Sonnet). Appended to the
+# system prompt as-is - the prompt and context go in the input - so it's
+# byte-identical across calls and can be served from Anthropic's prompt cache.
 IMPROV_PROMPT = """You are an expert prompt engineer. The user has requested prompt improvement with "improv:" prefix.
 
-Original prompt: "{original_prompt}"
+The prompt to improve is the user message. When conversation context is included, it comes first and the prompt follows the "Original prompt:" line.
 
 Your task:
 1. Apply Anthropic's prompt engineering best practices
@@ -54,21 +92,91 @@ Return ONLY the enhanced prompt text (no explanations, no markdown, no quotes).
 """
 
 
+HISTORY_FILE = os.path.join(HOOKS_CLAUDE_DIR, 'prompt_history.jsonl')
+# Keep only the last 500 entries. Appends are cheap, so the file is only
+# trimmed once it grows past HISTORY_TRIM_BYTES rather than on every prompt.
+HISTORY_LIMIT = 500
+HISTORY_TRIM_BYTES = 4 * 1024 * 1024
+# A trim keeps at most this much, so it always frees room for new entries
+HISTORY_KEEP_BYTES = HISTORY_TRIM_BYTES // 2
+
+def read_last_lines(path, count, max_line_bytes=None, block_size=64 * 1024):
+    """Return the last count lines of a file as bytes, reading it backwards in blocks
+    
+    With max_line_bytes, longer lines are skipped without being held in memory.
+    They still count towards count, so the lines around them are the same ones
+    a plain tail would return.
+    """
+    lines = []
+    found = 0
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        line_end = position  # File offset just past the line being read
+        pieces = []          # That line's bytes read so far, last piece first
+        
+        while position > 0 and found < count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size)
+            
+            end = read_size
+            while found < count:
+                # The newline that ends the current line doesn't start it
+                newline = block.rfind(b'\n', 0, min(end, line_end - 1 - position))
+                if newline < 0:
+                    break
+                line_start = position + newline + 1
+                found += 1
+                if max_line_bytes is None or line_end - line_start <= max_line_bytes:
+                    pieces.append(block[newline + 1:end])
+                    lines.append(b''.join(reversed(pieces)))
+                pieces = []
+                line_end = line_start
+                end = newline + 1
+            
+            # The rest of the block is the tail end of the next line back
+            if max_line_bytes is None or line_end - position <= max_line_bytes:
+                pieces.append(block[:end])
+            else:
+                pieces = []
+        
+        # The file's first line has no newline before it
+        if position == 0 and found < count and line_end > 0:
+            if max_line_bytes is None or line_end <= max_line_bytes:
+                lines.append(b''.join(reversed(pieces)))
+    
+    lines.reverse()
+    return lines
+
+def trim_prompt_history():
+    """Rewrite the history file with its last HISTORY_LIMIT entries, up to HISTORY_KEEP_BYTES"""
+    lines = read_last_lines(HISTORY_FILE, HISTORY_LIMIT)
+    # Drop the oldest entries until the rest fit, or every save would trim again
+    size = sum(len(line) for line in lines)
+    start = 0
+    while size > HISTORY_KEEP_BYTES:
+        size -= len(lines[start])
+        start += 1
+    
+    temp_file = f'{HISTORY_FILE}.{os.getpid()}.tmp'
+    with open(temp_file, 'wb') as f:
+        f.writelines(lines[start:])
+    os.replace(temp_file, HISTORY_FILE)
+
 def save_prompt_history(original, enhanced, model_used, had_improv_prefix):
-    """Save prompt enhancement history to JSON file"""
+    """Append a prompt enhancement entry to the JSONL history file"""
+    import json
+    
     try:
-        history_file = os.path.expanduser('~/.claude/hooks-using-claude/prompt_history.json')
-        
-        # Load existing history
-        if os.path.exists(history_file):
-            with open(history_file, 'r') as f:
-                history = json.load(f)
-        else:
-            history = []
+        # Local ISO 8601 time with microseconds, same as datetime.now().isoformat()
+        # but without importing datetime (time is loaded at interpreter startup)
+        seconds, nanoseconds = divmod(time.time_ns(), 1_000_000_000)
+        timestamp = f"{time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds))}.{nanoseconds // 1000:06d}"
         
         # Add new entry with optional pass property for evaluation
         entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp,
             "original_prompt": original,
             "enhanced_prompt": enhanced,
             "model_used": model_used,
@@ -76,15 +184,16 @@ def save_prompt_history(original, enhanced, model_used, had_improv_prefix):
             "pass": None  # Optional evaluation field (true/false/null)
         }
         
-        history.append(entry)
-        
-        # Keep only last 500 entries
-        if len(history) > 500:
-            history = history[-500:]
+        # One JSON object per line, so saving never reads or rewrites earlier entries.
+        # The line goes out as a single unbuffered append, which concurrent hook
+        # runs can't interleave. A run saves at most one entry, so one open per
+        # run costs no more than connecting to a long-lived writer process would.
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        with open(HISTORY_FILE, 'ab', buffering=0) as f:
+            f.write(line.encode())
         
-        # Save updated history
-        with open(history_file, 'w') as f:
-            json.dump(history, f, indent=2)
+        if os.path.getsize(HISTORY_FILE) > HISTORY_TRIM_BYTES:
+            trim_prompt_history()
             
         if DEBUG:
             print(f"Saved prompt history entry", file=sys.stderr)
@@ -93,27 +202,33 @@ def save_prompt_history(original, enhanced, model_used, had_improv_prefix):
         if DEBUG:
             print(f"Failed to save prompt history: {e}", file=sys.stderr)
 
+# Transcript lines longer than this (e.g. big tool results) aren't loaded for context
+TRANSCRIPT_MAX_LINE_BYTES = 256 * 1024
+
 def get_conversation_context(transcript_path, num_messages=3):
     """Extract recent conversation context from transcript file"""
+    import json
+    
     try:
         if not transcript_path or not os.path.exists(transcript_path):
             return "No conversation history available."
         
         context_lines = []
-        with open(transcript_path, 'r') as f:
-            lines = f.readlines()
-            
-        # Get last few messages (each line is a JSON message)
-        recent_lines = lines[-num_messages*2:] if len(lines) > num_messages*2 else lines
+        # Get last few messages (each line is a JSON message) without reading
+        # the rest of what can be a very long transcript. A huge line is skipped
+        # rather than held in memory, as its content is too long to use anyway.
+        recent_lines = read_last_lines(transcript_path, num_messages*2, max_line_bytes=TRANSCRIPT_MAX_LINE_BYTES)
         
+        # json rather than orjson: parsing a handful of lines takes microseconds,
+        # far less than the extra time orjson takes to import
         for line in recent_lines:
             try:
-                msg = json.loads(line.strip())
+                msg = json.loads(line)
                 role = msg.get('role', 'unknown')
                 content = msg.get('content', '')
                 if content and len(content) < 200:  # Keep context concise
                     context_lines.append(f"{role}: {content}")
-            except:
+            except Exception:
                 continue
                 
         return "\n".join(context_lines[-6:]) if context_lines else "No recent conversation context."
@@ -121,31 +236,89 @@ def get_conversation_context(transcript_path, num_messages=3):
     except Exception as e:
         return f"Error reading conversation context: {e}"
 
+def enhance_cache_path(prompt):
+    """Cache file for a prompt, keyed by a hash of its text"""
+    import hashlib
+    
+    key = hashlib.sha256(prompt.encode()).hexdigest()
+    return os.path.join(ENHANCE_CACHE_DIR, f"{key}.txt")
+
+def load_cached_enhancement(cache_path):
+    """Return the cached enhancement if there is one and it hasn't expired"""
+    try:
+        if time.time() - os.path.getmtime(cache_path) > ENHANCE_CACHE_TTL:
+            return None
+        with open(cache_path, 'r') as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+def save_cached_enhancement(cache_path, enhanced):
+    """Write an enhancement to the cache atomically"""
+    try:
+        os.makedirs(ENHANCE_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(enhanced)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+
+def circuit_is_open():
+    """Check whether Claude timed out within the last CIRCUIT_OPEN_SECONDS"""
+    try:
+        return time.time() - os.path.getmtime(CIRCUIT_FILE) < CIRCUIT_OPEN_SECONDS
+    except OSError:
+        return False
+
+def open_circuit():
+    """Record a Claude timeout; the file's mtime is when the circuit opened"""
+    try:
+        with open(CIRCUIT_FILE, 'w'):
+            pass
+    except OSError:
+        pass
+
+def close_circuit():
+    """Forget an earlier timeout once Claude answers in time again"""
+    try:
+        os.remove(CIRCUIT_FILE)
+    except OSError:
+        pass
+
 def enhance_with_claude(original_prompt, conversation_context=""):
     """Use Claude Sonnet v4 to enhance the user prompt with advanced prompt engineering"""
+    if circuit_is_open():
+        if DEBUG:
+            print("Claude enhancement skipped: it timed out recently", file=sys.stderr)
+        return None
+    
+    import re
+    import subprocess
+    
     model = 'sonnet'  # This is Sonnet v4
     
-    # Build the system prompt with enhancement instructions
-    system_prompt = IMPROV_PROMPT.format(original_prompt=original_prompt.replace('"', '\\"'))
+    # Everything that varies goes after the static instructions, in the input
+    claude_input = original_prompt
     if conversation_context:
-        system_prompt += f"\n\nConversation context:\n{conversation_context}"
+        claude_input = f"Conversation context:\n{conversation_context}\n\n---\nOriginal prompt:\n{original_prompt}"
     
     try:
-        # Save current directory and change to hooks isolation directory
-        original_cwd = os.getcwd()
-        hooks_claude_dir = os.path.expanduser('~/.claude/hooks-using-claude')
-        os.chdir(hooks_claude_dir)
-        
         # Run Claude in pipe mode with timeout, isolated from project sessions
+        # Claude runs in the hooks isolation directory; the project stays reachable via --add-dir
         # Use --append-to-system-prompt to add our enhancement instructions
-        claude_path = os.path.expanduser('~/.claude/local/claude')
+        # A fresh process per prompt is deliberate: a long-lived stream-json worker
+        # would carry every earlier enhancement along as conversation history and
+        # stay pinned to the --add-dir of whichever project started it.
         result = subprocess.run(
-            [claude_path, '-p', '--model', model, '--add-dir', original_cwd, '--append-to-system-prompt', system_prompt],
-            input=original_prompt,  # The original prompt is the input
+            [CLAUDE_PATH, '-p', '--model', model, '--add-dir', os.getcwd(), '--append-to-system-prompt', IMPROV_PROMPT],
+            input=claude_input,
             capture_output=True,
             text=True,
-            timeout=15
+            timeout=ENHANCE_TIMEOUT,
+            cwd=HOOKS_CLAUDE_DIR
         )
+        close_circuit()
         
         if result.returncode == 0:
             enhanced = result.stdout.strip()
@@ -154,9 +327,10 @@ def enhance_with_claude(original_prompt, conversation_context=""):
                 print(f"Claude raw output: {enhanced}", file=sys.stderr)
             
             # Clean up the response - remove any markdown formatting
-            enhanced = re.sub(r'^```.*\n', '', enhanced, flags=re.MULTILINE)
-            enhanced = re.sub(r'\n```$', '', enhanced)
-            enhanced = enhanced.strip()
+            if '```' in enhanced:
+                enhanced = re.sub(FENCE_OPEN_PATTERN, '', enhanced)
+                enhanced = re.sub(FENCE_CLOSE_PATTERN, '', enhanced)
+                enhanced = enhanced.strip()
             
             # Remove quotes if Claude added them
             if enhanced.startswith('"') and enhanced.endswith('"'):
@@ -166,35 +340,42 @@ def enhance_with_claude(original_prompt, conversation_context=""):
         
         return None
             
-    except (subprocess.TimeoutExpired, Exception) as e:
+    except subprocess.TimeoutExpired:
+        # subprocess.run has already killed claude
+        open_circuit()
+        if DEBUG:
+            print(f"Claude enhancement timed out after {ENHANCE_TIMEOUT}s", file=sys.stderr)
+        return None
+    except Exception as e:
         if DEBUG:
             print(f"Claude enhancement failed: {e}", file=sys.stderr)
         return None
-    finally:
-        # Always restore original working directory
-        try:
-            os.chdir(original_cwd)
-        except:
-            pass
 
 def main():
     try:
         # Read hook input from stdin
-        raw_input = sys.stdin.read()
+        raw_input = sys.stdin.buffer.read()
+        
+        # Most prompts have no improv: prefix - don't even parse their input
+        if b'improv:' not in raw_input.lower():
+            sys.stdout.write(EMPTY_RESULT)
+            return
+        
+        import json
         data = json.loads(raw_input)
         user_prompt = data.get('prompt', '').strip()
         transcript_path = data.get('transcript_path', '')
         
         if not user_prompt:
             # No prompt to enhance
-            print(json.dumps({}))
+            sys.stdout.write(EMPTY_RESULT)
             return
         
         # Check for improv: prefix - early return if not present
         has_improv_prefix = user_prompt.lower().startswith('improv:')
         if not has_improv_prefix:
             # Early return for normal prompts - bypass enhancement
-            print(json.dumps({}))
+            sys.stdout.write(EMPTY_RESULT)
             return
             
         # Remove the prefix for processing
@@ -203,35 +384,37 @@ def main():
         # Skip enhancement for very short prompts but still log them
         if len(clean_prompt) < 5:
             save_prompt_history(user_prompt, user_prompt, "skipped_short", has_improv_prefix)
-            print(json.dumps({}))
+            sys.stdout.write(EMPTY_RESULT)
+            return
+        
+        # Skip enhancement if this looks like our own enhancement prompt to prevent recursion.
+        # All patterns go in one alternation, so the prompt is scanned once rather than per pattern.
+        import re
+        if re.search('|'.join(map(re.escape, RECURSION_PATTERNS)), clean_prompt):
+            # Don't log recursion attempts - just exit silently
             return
         
-        # Skip enhancement if this looks like our own enhancement prompt to prevent recursion
-        recursion_patterns = [
-            "Improve this user prompt by removing ambiguity",
-            "You are an expert prompt engineer",
-            "Apply Anthropic's prompt engineering best practices", 
-            "Return ONLY the enhanced prompt text",
-            "Original prompt:",
-            "Your task:",
-            "Fix typos and improve clarity while preserving",
-            "Return ONLY the improved prompt text"
-        ]
-        
-        for pattern in recursion_patterns:
-            if pattern in clean_prompt:
-                # Don't log recursion attempts - just exit silently
-                return
-        
-        # Get conversation context for better enhancement
-        conversation_context = get_conversation_context(transcript_path)
-        
-        # Enhance the prompt with Claude
-        enhanced_prompt = enhance_with_claude(clean_prompt, conversation_context=conversation_context)
+        enhanced_prompt = None
+        model_used = 'sonnet_v4_improv'
+        if ENHANCE_CACHE:
+            cache_path = enhance_cache_path(clean_prompt)
+            enhanced_prompt = load_cached_enhancement(cache_path)
+            if enhanced_prompt:
+                model_used = 'sonnet_v4_improv_cached'
+        
+        if enhanced_prompt is None:
+            # Get conversation context for better enhancement
+            conversation_context = get_conversation_context(transcript_path)
+            
+            # Enhance the prompt with Claude
+            enhanced_prompt = enhance_with_claude(clean_prompt, conversation_context=conversation_context)
+            # Only real enhancements are cached so failures and no-ops are retried
+            if ENHANCE_CACHE and enhanced_prompt and enhanced_prompt != clean_prompt:
+                save_cached_enhancement(cache_path, enhanced_prompt)
         
         if enhanced_prompt and enhanced_prompt != clean_prompt:
             # Save to history with enhancement
-            save_prompt_history(user_prompt, enhanced_prompt, 'sonnet_v4_improv', True)
+            save_prompt_history(user_prompt, enhanced_prompt, model_used, True)
             
             # Add enhanced prompt as context instead of replacement
             print(f"\n[ENHANCED PROMPT]: {enhanced_prompt}")
@@ -244,7 +427,7 @@ def main():
         if DEBUG:
             print(f"Hook error: {e}", file=sys.stderr)
         # On any error, allow original prompt to proceed
-        print(json.dumps({}))
+        sys.stdout.write(EMPTY_RESULT)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file